@@ -73,6 +73,7 @@ CHECK_LAST_N_DAYS = int(os.getenv('CHECK_LAST_N_DAYS', 7))      # Check the last
 ENABLE_DIVERT_MONITORING = os.getenv('ENABLE_DIVERT_MONITORING', 'true').lower() == 'true'
 GMAIL_CREDENTIALS_PATH = os.getenv('GMAIL_CREDENTIALS_PATH', 'credentials.json')
 GMAIL_TOKEN_PATH = os.getenv('GMAIL_TOKEN_PATH', 'token.json')
+GMAIL_DIVERT_STATE_PATH = os.getenv('GMAIL_DIVERT_STATE_PATH', 'divert_state.json')  # Parsed emails cached between runs
 DIVERT_CHECK_DAYS = int(os.getenv('DIVERT_CHECK_DAYS', 7))  # How many days back to check for divert emails
 
 # Device-specific capabilities based on historical analysis
@@ -584,7 +585,8 @@ if ENABLE_DIVERT_MONITORING and GMAIL_AVAILABLE:
         print("Initializing Gmail divert monitoring...")
         divert_parser = GmailDivertParser(
             credentials_path=GMAIL_CREDENTIALS_PATH,
-            token_path=GMAIL_TOKEN_PATH
+            token_path=GMAIL_TOKEN_PATH,
+            state_path=GMAIL_DIVERT_STATE_PATH
         )
         
         # Update divert status from recent emails
@@ -9,13 +9,18 @@ import os
 import re
 import json
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from onc.onc import ONC
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# SoG DDS email labels, keyed by base location code and (as a fallback)
+# by a keyword in the upper-cased ONC location name
+SOG_BASE_LABELS = {'ECHO': 'SoG_East', 'CBCH': 'SoG_Delta', 'PSGCH': 'SoG_Central'}
+SOG_NAME_LABELS = {'CASCADIA': 'SoG_Delta', 'CENTRAL': 'SoG_Central'}
+
 def discover_hydrophone_locations():
     """
     Discover all current hydrophone locations using the ONC API
@@ -31,7 +36,9 @@ def discover_hydrophone_locations():
     onc = ONC(token)
     
     # Get current hydrophone deployments
-    datefrom = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    # Truncated to the hour so repeated runs issue identical (cacheable) queries
+    datefrom = (datetime.now(timezone.utc) - timedelta(days=30)).replace(
+        minute=0, second=0, microsecond=0, tzinfo=None).isoformat() + '.000Z'
     
     try:
         deployments = onc.getDeployments({
@@ -42,17 +49,32 @@ def discover_hydrophone_locations():
         locations_info = {}
         
         print(f"   Found {len(deployments)} hydrophone deployments")
-        
+
+        # Fetch details for every hydrophone location in one request rather
+        # than one request per deployment
+        try:
+            hydrophone_locations = onc.getLocations({
+                'deviceCategoryCode': 'HYDROPHONE',
+                'dateFrom': datefrom
+            })
+        except Exception as e:
+            print(f"   Warning: Could not get hydrophone locations in bulk: {e}")
+            hydrophone_locations = []
+        location_lookup = {loc['locationCode']: loc for loc in hydrophone_locations
+                           if isinstance(loc, dict) and loc.get('locationCode')}
+
         for deployment in deployments:
             if not deployment.get('end'):  # Only active deployments
                 location_code = deployment['locationCode']
-                
+
                 # Get detailed location information
                 try:
-                    location_details = onc.getLocations({'locationCode': location_code})
-                    if location_details:
-                        location_info = location_details[0]
-                        
+                    location_info = location_lookup.get(location_code)
+                    if location_info is None:
+                        # Not covered by the bulk request - query it directly
+                        location_details = onc.getLocations({'locationCode': location_code})
+                        location_info = location_details[0] if location_details else None
+                    if location_info:
                         # Store comprehensive location data
                         locations_info[location_code] = {
                             'locationCode': location_code,
@@ -172,9 +194,13 @@ def extract_location_mapping_clues(locations_info):
     
     return mapping_clues
 
+def _format_mapping_row(key, hydrophones, comment):
+    """Format a single LOCATION_MAPPING entry line."""
+    return f"    '{key}': {hydrophones},{comment}"
+
 def generate_divert_mapping(locations_info, mapping_clues, categorized_locations):
     """
-    Generate the Python code for the divert location mapping
+    Generate the Python code for the divert location mapping, one line at a time
     """
     print("\n🔧 Generating divert location mapping...")
     
@@ -192,47 +218,42 @@ def generate_divert_mapping(locations_info, mapping_clues, categorized_locations
     for base_location in location_arrays:
         location_arrays[base_location].sort()
     
-    mapping_code = '''# Location mapping - maps email location names to hydrophone location codes
-# Auto-generated from ONC API discovery
-LOCATION_MAPPING = {
-    # SoG DDS system locations'''
+    yield '# Location mapping - maps email location names to hydrophone location codes'
+    yield '# Auto-generated from ONC API discovery'
+    yield 'LOCATION_MAPPING = {'
+    yield '    # SoG DDS system locations'
     
-    # Add SoG locations
-    sog_mappings = []
+    # Add SoG locations, skipping duplicates while preserving order
+    seen = set()
     for loc_code, info in categorized_locations['sog_locations']:
         base_match = re.match(r'([A-Z]+)', loc_code)
         if base_match:
             base = base_match.group(1)
             if location_arrays[base]:
-                if 'ECHO' in base:
-                    sog_mappings.append(f"    'SoG_East': {location_arrays[base]},  # {info['locationName']}")
-                elif 'CBCH' in base or 'CASCADIA' in info['locationName'].upper():
-                    sog_mappings.append(f"    'SoG_Delta': {location_arrays[base]},  # {info['locationName']}")
-                elif 'PSGCH' in base or 'CENTRAL' in info['locationName'].upper():
-                    sog_mappings.append(f"    'SoG_Central': {location_arrays[base]},  # {info['locationName']}")
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_sog = []
-    for mapping in sog_mappings:
-        if mapping not in seen:
-            unique_sog.append(mapping)
-            seen.add(mapping)
-    
-    mapping_code += '\n' + '\n'.join(unique_sog)
+                label = next((v for k, v in SOG_BASE_LABELS.items() if k in base), None)
+                if label is None:
+                    upper_name = info['locationName'].upper()
+                    label = next((v for k, v in SOG_NAME_LABELS.items() if k in upper_name), None)
+                if label:
+                    mapping = f"    '{label}': {location_arrays[base]},  # {info['locationName']}"
+                    if mapping not in seen:
+                        seen.add(mapping)
+                        yield mapping
     
     # Add Saanich locations
-    mapping_code += '\n    \n    # Saanich DDS system locations'
+    yield '    '
+    yield '    # Saanich DDS system locations'
     for loc_code, info in categorized_locations['saanich_locations']:
         base_match = re.match(r'([A-Z]+)', loc_code)
         if base_match:
             base = base_match.group(1)
             if location_arrays[base]:
-                mapping_code += f"\n    'Saanich_Inlet': {location_arrays[base]},  # {info['locationName']}"
+                yield f"    'Saanich_Inlet': {location_arrays[base]},  # {info['locationName']}"
                 break  # Only add once
     
     # Add NC-DDS locations with bracket format
-    mapping_code += '\n    \n    # NC-DDS system locations - with bracket format'
+    yield '    '
+    yield '    # NC-DDS system locations - with bracket format'
     
     nc_mappings = {
         1: ('Barkley Cnyn', 'BACNH', 'BACUS'),
@@ -241,7 +262,15 @@ LOCATION_MAPPING = {
         4: ('ODP 889', None),  # To be identified
         5: ('Folger Pass', 'FGPD'),
     }
-    
+
+    # Index discovered ODP sites by site number (e.g. '1027' -> location code)
+    odp_index = {}
+    for loc_code, info in categorized_locations['odp_locations']:
+        odp_match = re.search(r'ODP\s*(\d+)', info['locationName'], re.IGNORECASE)
+        if odp_match:
+            odp_index.setdefault(odp_match.group(1), loc_code)
+
+    nc_rows = []
     for num, (name, *base_codes) in nc_mappings.items():
         hydrophones = []
         for base_code in base_codes:
@@ -250,26 +279,13 @@ LOCATION_MAPPING = {
         
         # Special handling for ODP sites found in discovery
         if 'ODP' in name:
-            for loc_code, info in categorized_locations['odp_locations']:
-                location_name = info['locationName']
-                if '1027' in location_name and '1027' in name:
-                    # Found ODP 1027 site
-                    base_match = re.match(r'([A-Z]+)', loc_code)
-                    if base_match:
-                        base = base_match.group(1)
-                        if location_arrays[base]:
-                            hydrophones = location_arrays[base]
-                    comment = f"  # {location_name}"
-                elif '889' in location_name and '889' in name:
-                    # Found ODP 889 site  
-                    base_match = re.match(r'([A-Z]+)', loc_code)
-                    if base_match:
-                        base = base_match.group(1)
-                        if location_arrays[base]:
-                            hydrophones = location_arrays[base]
-                    comment = f"  # {location_name}"
-                else:
-                    comment = f"  # Need to identify corresponding ONC location"
+            site = re.search(r'\d+', name).group(0)
+            loc_code = odp_index.get(site)
+            if loc_code:
+                base_match = re.match(r'([A-Z]+)', loc_code)
+                if base_match and location_arrays.get(base_match.group(1)):
+                    hydrophones = location_arrays[base_match.group(1)]
+                comment = f"  # {locations_info[loc_code]['locationName']}"
             else:
                 comment = f"  # Need to identify corresponding ONC location"
         else:
@@ -283,30 +299,18 @@ LOCATION_MAPPING = {
                             break
                     break
         
-        mapping_code += f"\n    '[{num}] {name}': {hydrophones},{comment}"
+        nc_rows.append((num, name, hydrophones, comment))
     
-    # Add fallback format without brackets
-    mapping_code += '\n    \n    # NC-DDS system locations - without bracket format (fallback)'
-    for num, (name, *base_codes) in nc_mappings.items():
-        hydrophones = []
-        for base_code in base_codes:
-            if base_code and base_code in location_arrays:
-                hydrophones.extend(location_arrays[base_code])
-        
-        comment = ""
-        for base_code in base_codes:
-            if base_code and base_code in location_arrays:
-                for loc_code, info in locations_info.items():
-                    if loc_code.startswith(base_code):
-                        comment = f"  # {info['locationName']}"
-                        break
-                break
-        
-        mapping_code += f"\n    '{name}': {hydrophones},{comment}"
+    for num, name, hydrophones, comment in nc_rows:
+        yield _format_mapping_row(f'[{num}] {name}', hydrophones, comment)
     
-    mapping_code += '\n}'
+    # Add fallback format without brackets (same rows, unbracketed keys)
+    yield '    '
+    yield '    # NC-DDS system locations - without bracket format (fallback)'
+    for num, name, hydrophones, comment in nc_rows:
+        yield _format_mapping_row(name, hydrophones, comment)
     
-    return mapping_code
+    yield '}'
 
 def main():
     """Main function to discover and generate divert mappings"""
@@ -327,24 +331,18 @@ def main():
         # Step 3: Extract mapping clues
         mapping_clues = extract_location_mapping_clues(locations_info)
         
-        # Step 4: Generate the mapping code
-        mapping_code = generate_divert_mapping(locations_info, mapping_clues, categorized)
-        
-        # Step 5: Display results
-        print("\n" + "=" * 80)
-        print("✨ GENERATED DIVERT LOCATION MAPPING")
-        print("=" * 80)
-        print(mapping_code)
-        
-        # Step 6: Save to file
+        # Step 4: Generate the mapping code and stream it straight to file
         output_file = 'auto_generated_divert_mapping.py'
+        line_count = 0
         with open(output_file, 'w') as f:
             f.write(f'"""\nAuto-generated divert location mapping\nGenerated on: {datetime.now()}\n"""\n\n')
-            f.write(mapping_code)
-            
-        print(f"\n💾 Mapping saved to: {output_file}")
+            for line in generate_divert_mapping(locations_info, mapping_clues, categorized):
+                f.write(line + '\n')
+                line_count += 1
+        
+        print(f"\n💾 Generated mapping ({line_count} lines) saved to: {output_file}")
         
-        # Step 7: Summary
+        # Step 5: Summary
         print(f"\n📊 DISCOVERY SUMMARY:")
         print(f"   Total hydrophone locations: {len(locations_info)}")
         print(f"   SoG DDS locations: {len(categorized['sog_locations'])}")
@@ -5,6 +5,7 @@ Standalone script for discovering hydrophone locations.
 Uses the organized hydrophonedashboard package structure.
 """
 
+import argparse
 import sys
 import os
 
@@ -14,11 +15,17 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
 from hydrophonedashboard.utils.location_discovery import list_hydrophone_locations
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Discover ONC locations with hydrophone data.")
+    arg_parser.add_argument(
+        '--refresh', action='store_true',
+        help='ignore the cached location list (kept for a day) and query the ONC API')
+    args = arg_parser.parse_args()
+    
     print("🌊 Hydrophone Location Discovery Script")
     print("Using organized hydrophonedashboard package")
     print("-" * 50)
     
-    locations = list_hydrophone_locations()
+    locations = list_hydrophone_locations(force_refresh=args.refresh)
     
     if locations:
         print(f"\n📋 Summary: Found {len(locations)} unique locations")
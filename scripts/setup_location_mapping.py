@@ -4,28 +4,46 @@ Location Mapping Setup Tool
 Helps verify and correct the mapping between divert email locations and actual hydrophone location codes.
 """
 
+import argparse
+import mmap
 import os
 import sys
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+try:
+    from rapidfuzz import fuzz, process  # optional: pip install rapidfuzz
+except ImportError:
+    fuzz = process = None
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
 # Load environment variables
 load_dotenv()
 
+# Matches dashboard location codes, e.g. <span>Site</span>LOCATION_CODE</span>
+# (bytes pattern so it can scan the memory-mapped file without decoding it;
+# the possessive quantifier rules out backtracking on malformed HTML)
+try:
+    import regex  # optional: pip install regex
+    _SITE_RE = regex.compile(rb'<span>Site</span>([A-Z0-9\.]++)</span>')
+except ImportError:
+    import re
+    # Possessive quantifiers need Python 3.11+ in re; a single character
+    # class between fixed literals cannot backtrack badly anyway
+    _SITE_RE = re.compile(rb'<span>Site</span>([A-Z0-9\.]+)</span>')
+
 def extract_hydrophone_locations():
     """Extract actual hydrophone location codes from the dashboard HTML."""
     try:
-        with open('Hydrophone.html', 'r') as f:
-            content = f.read()
-        
         # Extract location codes from the HTML structure
-        import re
-        # Look for patterns like <span>Site</span>LOCATION_CODE
-        pattern = r'<span>Site</span>([A-Z0-9\.]+)</span>'
-        matches = re.findall(pattern, content)
+        with open('Hydrophone.html', 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            matches = _SITE_RE.findall(content)
         
-        # Remove duplicates and sort
-        actual_locations = sorted(list(set(matches)))
+        # Remove duplicates, decode and sort
+        actual_locations = sorted({match.decode('ascii') for match in matches})
         return actual_locations
     except FileNotFoundError:
         print("❌ Hydrophone.html not found. Run Hydrophone.py first to generate the dashboard.")
@@ -37,7 +55,7 @@ def extract_hydrophone_locations():
 def analyze_divert_emails():
     """Analyze recent divert emails to find location names."""
     try:
-        from gmail_divert_parser import GmailDivertParser
+        from hydrophonedashboard.divert.gmail_parser import GmailDivertParser
         
         parser = GmailDivertParser()
         if not parser.authenticate():
@@ -48,21 +66,12 @@ def analyze_divert_emails():
         print("📧 Analyzing recent divert emails...")
         parser.update_divert_status(days_back=30)
         
-        # Extract unique email location names from history
+        # update_divert_status has already parsed every divert email once; each
+        # history entry keeps the raw email location names, so no re-fetching
+        # or re-parsing is needed here
         email_locations = set()
         for event in parser.divert_history:
-            # Get original email subject and body to extract raw location names
-            subject = event.get('email_subject', '')
-            if '[Divert]' in subject:
-                # Re-parse the email to get original location names
-                messages = parser.search_divert_emails(days_back=30)
-                for message in messages[:10]:  # Check first 10 for speed
-                    email_subject, email_body, email_date = parser.get_email_content(message['id'])
-                    if subject in email_subject:
-                        parsed = parser.parse_divert_email(email_subject, email_body, email_date)
-                        for location in parsed['locations'].keys():
-                            email_locations.add(location)
-                        break
+            email_locations.update(event['locations'])
         
         return email_locations
     except ImportError:
@@ -72,15 +81,50 @@ def analyze_divert_emails():
         print(f"❌ Error analyzing emails: {e}")
         return set()
 
+def suggest_by_name_similarity(email_locations, actual_locations):
+    """
+    Suggest hydrophone locations whose cleaned name resembles the cleaned
+    email location name.
+
+    Uses rapidfuzz partial-ratio scoring (top 3 candidates scoring >= 75)
+    when rapidfuzz is installed, otherwise falls back to a plain substring
+    test in either direction.
+    """
+    email_cleans = {loc: loc.replace('[', '').replace(']', '').replace(' ', '').upper()
+                    for loc in email_locations}
+    # Cleaned once per hydrophone, not once per (email, hydrophone) pair
+    clean_hydros = [(loc, loc.replace('.', '').upper()) for loc in actual_locations]
+
+    if process is None:
+        return [(email_loc, hydro_loc)
+                for email_loc, email_clean in email_cleans.items()
+                for hydro_loc, hydro_clean in clean_hydros
+                if email_clean in hydro_clean or hydro_clean in email_clean]
+
+    choices = [hydro_clean for _, hydro_clean in clean_hydros]
+    suggestions = []
+    for email_loc, email_clean in email_cleans.items():
+        candidates = process.extract(email_clean, choices, scorer=fuzz.partial_ratio,
+                                     score_cutoff=75, limit=3)
+        suggestions.extend((email_loc, clean_hydros[index][0]) for _, _, index in candidates)
+    return suggestions
+
 def get_current_mappings():
     """Get current location mappings from the parser."""
     try:
-        from gmail_divert_parser import LOCATION_MAPPING
+        from hydrophonedashboard.config.location_mappings import LOCATION_MAPPING
         return LOCATION_MAPPING
     except ImportError:
         return {}
 
-def main():
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description="Verify divert email location mappings against the dashboard's hydrophone locations.")
+    arg_parser.add_argument(
+        '--with-emails', action='store_true',
+        help='also scan the last 30 days of divert emails via Gmail (slower; needs Gmail credentials)')
+    args = arg_parser.parse_args(argv)
+    
     print("🗺️  Location Mapping Setup Tool")
     print("=" * 50)
     
@@ -96,16 +140,22 @@ def main():
         print("❌ No locations found. Please run Hydrophone.py first.")
         return 1
     
-    # Get email locations
-    print(f"\n📧 Analyzing divert email locations...")
-    email_locations = analyze_divert_emails()
+    # Set view for the membership tests below
+    actual_set = frozenset(actual_locations)
     
-    if email_locations:
-        print(f"✅ Found {len(email_locations)} unique email locations:")
-        for i, location in enumerate(sorted(email_locations), 1):
-            print(f"   {i:2d}. '{location}'")
+    # Get email locations (Gmail authentication and a 30-day scan, so opt-in)
+    if args.with_emails:
+        print(f"\n📧 Analyzing divert email locations...")
+        email_locations = analyze_divert_emails()
+        
+        if email_locations:
+            print(f"✅ Found {len(email_locations)} unique email locations:")
+            for i, location in enumerate(sorted(email_locations), 1):
+                print(f"   {i:2d}. '{location}'")
+        else:
+            print("❌ No email locations found.")
     else:
-        print("❌ No email locations found.")
+        print(f"\n📧 Skipping divert email analysis (use --with-emails to include it)")
     
     # Get current mappings
     print(f"\n🗺️  Current location mappings:")
@@ -117,6 +167,10 @@ def main():
     else:
         print("❌ No current mappings found.")
     
+    if not args.with_emails:
+        # Without email data, check every configured mapping instead
+        email_locations = set(current_mappings)
+    
     # Analysis
     print(f"\n🔍 MAPPING ANALYSIS")
     print("=" * 30)
@@ -126,14 +180,14 @@ def main():
     mapped_to_nonexistent = []
     
     for email_loc in email_locations:
-        if email_loc not in current_mappings:
+        mapped_hydros = current_mappings.get(email_loc)
+        if mapped_hydros is None:
             unmapped_email_locations.append(email_loc)
-        else:
-            # Check if mapped hydrophone locations actually exist
-            mapped_hydros = current_mappings[email_loc]
-            for hydro_loc in mapped_hydros:
-                if hydro_loc not in actual_locations:
-                    mapped_to_nonexistent.append((email_loc, hydro_loc))
+            continue
+        # Check if mapped hydrophone locations actually exist
+        for hydro_loc in mapped_hydros:
+            if hydro_loc not in actual_set:
+                mapped_to_nonexistent.append((email_loc, hydro_loc))
     
     if unmapped_email_locations:
         print(f"\n⚠️  Email locations without mappings:")
@@ -150,16 +204,7 @@ def main():
     print("=" * 30)
     
     # Look for potential matches based on similar names
-    suggestions = []
-    
-    for email_loc in unmapped_email_locations:
-        # Simple fuzzy matching
-        email_clean = email_loc.replace('[', '').replace(']', '').replace(' ', '').upper()
-        for hydro_loc in actual_locations:
-            hydro_clean = hydro_loc.replace('.', '').upper()
-            # Check for partial matches
-            if email_clean in hydro_clean or hydro_clean in email_clean:
-                suggestions.append((email_loc, hydro_loc))
+    suggestions = suggest_by_name_similarity(unmapped_email_locations, actual_locations)
     
     # Known common mappings from email patterns
     known_patterns = {
@@ -179,7 +224,7 @@ def main():
     print(f"\nValidating known patterns against actual locations:")
     for email_loc, suggested_hydros in known_patterns.items():
         if email_loc in email_locations:
-            existing_hydros = [h for h in suggested_hydros if h in actual_locations]
+            existing_hydros = [h for h in suggested_hydros if h in actual_set]
             if existing_hydros:
                 print(f"   ✅ '{email_loc}' → {existing_hydros}")
             else:
@@ -194,15 +239,19 @@ def main():
     # Include existing working mappings
     for email_loc, hydro_locs in current_mappings.items():
         # Only include if all mapped locations exist
-        valid_hydros = [h for h in hydro_locs if h in actual_locations]
+        valid_hydros = [h for h in hydro_locs if h in actual_set]
         if valid_hydros and email_loc in email_locations:
             print(f"    '{email_loc}': {valid_hydros},")
     
     # Add suggestions for unmapped locations
+    suggestions_by_email = {}
+    for email_loc, hydro_loc in suggestions:
+        suggestions_by_email.setdefault(email_loc, []).append(hydro_loc)
+    
     for email_loc in unmapped_email_locations:
         print(f"    # TODO: Map '{email_loc}' to appropriate hydrophone location(s)")
         # Show potential matches
-        potential = [hydro for email_test, hydro in suggestions if email_test == email_loc]
+        potential = suggestions_by_email.get(email_loc)
         if potential:
             print(f"    # Suggestions: {potential}")
         print(f"    '{email_loc}': [],  # UPDATE THIS")
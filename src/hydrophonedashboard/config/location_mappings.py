@@ -15,58 +15,79 @@ Location Discovery Sources:
 - Cross-reference with ONC data portal
 """
 
+import functools
+import sys
+import types
+from collections import Counter
+from itertools import chain
+
+# NC-DDS (Northern Canadian) locations, in the order the emails number them.
+# Emails use both '[n] Name' and plain 'Name'; both keys share the same tuple.
+_NC_DDS_CANONICAL = {
+    'Barkley Cnyn': ('BACNH.H1', 'BACNH.H2', 'BACNH.H3', 'BACNH.H4', 'BACUS'),  # Barkley Canyon (main array + upper slope)
+    'ODP 1027': ('CBCH.H1', 'CBCH.H2', 'CBCH.H3', 'CBCH.H4'),   # ODP 1027C = Cascadia Basin (CBCH)
+    'Endeavour': ('KEMFH.H1', 'KEMFH.H2', 'KEMFH.H3', 'KEMFH.H4'),  # Endeavour = KEMFH array
+    'ODP 889': (),    # ODP 889 - need to identify corresponding ONC location code
+    'Folger Pass': ('FGPD',),  # Folger Pass = Folger Deep
+}
+
+_NC_DDS_BRACKETED = {
+    f'[{number}] {name}': codes
+    for number, (name, codes) in enumerate(_NC_DDS_CANONICAL.items(), 1)
+}
+
 # Location mapping - maps email location names to hydrophone location codes
 # Based on actual ONC hydrophone deployments and divert system naming
-LOCATION_MAPPING = {
+_LOCATION_MAPPING = {
     # ================================
     # SoG DDS (Strait of Georgia) System Locations
     # ================================
-    'SoG_East': ['ECHO3.H1', 'ECHO3.H2', 'ECHO3.H3', 'ECHO3.H4'],  # SoG East = ECHO3 array
-    'SoG_Delta': ['CBCH.H1', 'CBCH.H2', 'CBCH.H3', 'CBCH.H4'],    # SoG Delta = Cascadia Basin array
-    'SoG_Central': ['PSGCH.H1', 'PSGCH.H3'],  # SoG Central = PSGCH array (only H1 and H3 active)
+    'SoG_East': ('ECHO3.H1', 'ECHO3.H2', 'ECHO3.H3', 'ECHO3.H4'),  # SoG East = ECHO3 array
+    'SoG_Delta': ('CBCH.H1', 'CBCH.H2', 'CBCH.H3', 'CBCH.H4'),    # SoG Delta = Cascadia Basin array
+    'SoG_Central': ('PSGCH.H1', 'PSGCH.H3'),  # SoG Central = PSGCH array (only H1 and H3 active)
     
     # ================================
     # Saanich DDS System Locations  
     # ================================
-    'Saanich_Inlet': ['PVIPH.H1', 'PVIPH.H3'],  # Saanich Inlet = PVIPH array (only H1 and H3 active)
+    'Saanich_Inlet': ('PVIPH.H1', 'PVIPH.H3'),  # Saanich Inlet = PVIPH array (only H1 and H3 active)
     
     # ================================
     # NC-DDS (Northern Canadian) System Locations - with bracket format
     # ================================
-    '[1] Barkley Cnyn': ['BACNH.H1', 'BACNH.H2', 'BACNH.H3', 'BACNH.H4', 'BACUS'],  # Barkley Canyon (main array + upper slope)
-    '[2] ODP 1027': ['CBCH.H1', 'CBCH.H2', 'CBCH.H3', 'CBCH.H4'],   # ODP 1027C = Cascadia Basin (CBCH)
-    '[3] Endeavour': ['KEMFH.H1', 'KEMFH.H2', 'KEMFH.H3', 'KEMFH.H4'],  # Endeavour = KEMFH array
-    '[4] ODP 889': [],    # ODP 889 - need to identify corresponding ONC location code  
-    '[5] Folger Pass': ['FGPD'],  # Folger Pass = Folger Deep
+    **_NC_DDS_BRACKETED,
     
     # ================================
     # Additional ODP Sites (Ocean Drilling Program)
     # ================================
-    'ODP 1364A': ['CQSH.H1', 'CQSH.H2', 'CQSH.H3', 'CQSH.H4'],  # ODP 1364A = Clayoquot Slope (CQSH)
-    'ODP 1026': ['NC27.H3', 'NC27.H4'],  # ODP 1026 = NC27 array (only H3 and H4 active)
+    'ODP 1364A': ('CQSH.H1', 'CQSH.H2', 'CQSH.H3', 'CQSH.H4'),  # ODP 1364A = Clayoquot Slope (CQSH)
+    'ODP 1026': ('NC27.H3', 'NC27.H4'),  # ODP 1026 = NC27 array (only H3 and H4 active)
     
     # ================================
     # NC-DDS System Locations - without bracket format (fallback)
     # ================================
-    'Barkley Cnyn': ['BACNH.H1', 'BACNH.H2', 'BACNH.H3', 'BACNH.H4', 'BACUS'],  # Barkley Canyon (main array + upper slope)
-    'ODP 1027': ['CBCH.H1', 'CBCH.H2', 'CBCH.H3', 'CBCH.H4'],   # ODP 1027C = Cascadia Basin (CBCH)
-    'Endeavour': ['KEMFH.H1', 'KEMFH.H2', 'KEMFH.H3', 'KEMFH.H4'],  # Endeavour = KEMFH array
-    'ODP 889': [],    # ODP 889 - need to identify corresponding ONC location code
-    'Folger Pass': ['FGPD'],  # Folger Pass = Folger Deep
+    **_NC_DDS_CANONICAL,
     
     # ================================
     # Additional Location Mappings (if these locations appear in emails)
     # ================================
-    'Burrard Inlet': ['BIIP'],  # Burrard Inlet
-    'Cambridge Bay': ['CBYIP'],  # Cambridge Bay 
-    'China Creek': ['CCIP'],   # China Creek
-    'Clayoquot Slope': ['CQSH.H1', 'CQSH.H2', 'CQSH.H3', 'CQSH.H4'],  # Clayoquot Slope array (ODP 1364A)
-    'Digby Island': ['DIIP'],  # Digby Island
-    'Hartley Bay': ['HBIP'],   # Hartley Bay
-    'Holyrood Bay': ['HRBIP'],  # Holyrood Bay / Conception Bay
-    'Kitamaat Village': ['KVIP'],  # Kitamaat Village
+    'Burrard Inlet': ('BIIP',),  # Burrard Inlet
+    'Cambridge Bay': ('CBYIP',),  # Cambridge Bay 
+    'China Creek': ('CCIP',),   # China Creek
+    'Clayoquot Slope': ('CQSH.H1', 'CQSH.H2', 'CQSH.H3', 'CQSH.H4'),  # Clayoquot Slope array (ODP 1364A)
+    'Digby Island': ('DIIP',),  # Digby Island
+    'Hartley Bay': ('HBIP',),   # Hartley Bay
+    'Holyrood Bay': ('HRBIP',),  # Holyrood Bay / Conception Bay
+    'Kitamaat Village': ('KVIP',),  # Kitamaat Village
 }
 
+# Intern the keys so get_hydrophone_codes lookups with interned location
+# names match on identity before comparing text
+_LOCATION_MAPPING = {sys.intern(location): codes for location, codes in _LOCATION_MAPPING.items()}
+
+# Read-only view: the mapping is a module constant (and the helpers below
+# cache results derived from it), so it must not be modified at runtime
+LOCATION_MAPPING = types.MappingProxyType(_LOCATION_MAPPING)
+
 # ================================
 # System Classifications
 # ================================
@@ -78,15 +99,17 @@ SAANICH_DDS_LOCATIONS = {
     'Saanich_Inlet'
 }
 
-NC_DDS_LOCATIONS = {
-    '[1] Barkley Cnyn', '[2] ODP 1027', '[3] Endeavour', '[4] ODP 889', '[5] Folger Pass',
-    'Barkley Cnyn', 'ODP 1027', 'Endeavour', 'ODP 889', 'Folger Pass'
-}
+NC_DDS_LOCATIONS = set(_NC_DDS_BRACKETED) | set(_NC_DDS_CANONICAL)
 
-ODP_LOCATIONS = {
+ODP_LOCATIONS = frozenset({
     'ODP 1027', 'ODP 1364A', 'ODP 1026', 'ODP 889',
     '[2] ODP 1027', '[4] ODP 889'
-}
+})
+
+# Reverse index: location name -> system name, for single-lookup classification
+_LOCATION_SYSTEM = {location: 'Saanich DDS' for location in SAANICH_DDS_LOCATIONS}
+_LOCATION_SYSTEM.update({location: 'NC-DDS' for location in NC_DDS_LOCATIONS})
+_LOCATION_SYSTEM.update({location: 'SoG DDS' for location in SOG_DDS_LOCATIONS})
 
 # ================================
 # Helper Functions
@@ -102,14 +125,7 @@ def get_system_for_location(location_name):
     Returns:
         str: System name ('SoG DDS', 'NC-DDS', 'Saanich DDS', or 'Unknown')
     """
-    if location_name in SOG_DDS_LOCATIONS:
-        return 'SoG DDS'
-    elif location_name in NC_DDS_LOCATIONS:
-        return 'NC-DDS'
-    elif location_name in SAANICH_DDS_LOCATIONS:
-        return 'Saanich DDS'
-    else:
-        return 'Unknown'
+    return _LOCATION_SYSTEM.get(location_name, 'Unknown')
 
 def get_hydrophone_codes(location_name):
     """
@@ -119,9 +135,9 @@ def get_hydrophone_codes(location_name):
         location_name: Location name from email
         
     Returns:
-        list: List of hydrophone codes, or empty list if not found
+        tuple: Hydrophone codes, or an empty tuple if not found
     """
-    return LOCATION_MAPPING.get(location_name, [])
+    return LOCATION_MAPPING.get(location_name, ())
 
 def is_odp_location(location_name):
     """
@@ -135,52 +151,55 @@ def is_odp_location(location_name):
     """
     return location_name in ODP_LOCATIONS
 
+@functools.lru_cache(maxsize=1)
 def get_all_mapped_locations():
     """
     Get all location names that have hydrophone mappings.
     
     Returns:
-        list: List of location names with non-empty mappings
+        tuple: Location names with non-empty mappings (cached)
     """
-    return [location for location, codes in LOCATION_MAPPING.items() if codes]
+    return tuple(location for location, codes in LOCATION_MAPPING.items() if codes)
 
+@functools.lru_cache(maxsize=1)
 def get_unmapped_locations():
     """
     Get all location names that don't have hydrophone mappings yet.
     
     Returns:
-        list: List of location names with empty mappings
+        tuple: Location names with empty mappings (cached)
     """
-    return [location for location, codes in LOCATION_MAPPING.items() if not codes]
+    return tuple(location for location, codes in LOCATION_MAPPING.items() if not codes)
 
+@functools.lru_cache(maxsize=1)
 def validate_mapping():
     """
     Validate the location mapping for completeness and consistency.
     
+    LOCATION_MAPPING is a module constant, so the result is computed once
+    and cached for the lifetime of the process.
+    
     Returns:
-        dict: Validation results with statistics
+        Mapping: Read-only validation results with statistics (cached)
     """
     total_locations = len(LOCATION_MAPPING)
     mapped_locations = len(get_all_mapped_locations())
     unmapped_locations = len(get_unmapped_locations())
     
     # Check for duplicate hydrophone codes
-    all_codes = []
-    for codes in LOCATION_MAPPING.values():
-        all_codes.extend(codes)
-    
-    unique_codes = set(all_codes)
-    duplicates = len(all_codes) - len(unique_codes)
+    code_counts = Counter(chain.from_iterable(LOCATION_MAPPING.values()))
+    duplicates = sum(code_counts.values()) - len(code_counts)
     
-    return {
+    # Read-only, since every caller shares the cached result
+    return types.MappingProxyType({
         'total_locations': total_locations,
         'mapped_locations': mapped_locations,
         'unmapped_locations': unmapped_locations,
         'mapping_completeness': mapped_locations / total_locations if total_locations > 0 else 0,
-        'total_hydrophone_codes': len(unique_codes),
+        'total_hydrophone_codes': len(code_counts),
         'duplicate_assignments': duplicates,
         'unmapped_location_names': get_unmapped_locations()
-    }
+    })
 
 if __name__ == "__main__":
     # Print validation information when run directly
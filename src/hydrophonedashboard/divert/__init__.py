@@ -5,6 +5,6 @@ Handles Gmail API integration for parsing divert status emails and
 mapping email locations to hydrophone location codes.
 """
 
-from .gmail_parser import GmailDivertParser
+from .gmail_parser import DivertPeriod, GmailDivertParser
 
-__all__ = ['GmailDivertParser'] 
\ No newline at end of file
+__all__ = ['DivertPeriod', 'GmailDivertParser'] 
\ No newline at end of file
@@ -7,7 +7,12 @@ not collecting data due to diversions.
 import os
 import json
 import re
-import base64
+import time
+import threading
+from dataclasses import dataclass
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from google.auth.transport.requests import Request
@@ -18,39 +23,141 @@ from googleapiclient.errors import HttpError
 from email.mime.text import MIMEText
 import logging
 
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module
+except ImportError:
+    import base64
+
 # Import location mappings from config module
 from ..config.location_mappings import LOCATION_MAPPING
 
+# LOCATION_MAPPING keyed by case-folded location name, so email locations
+# match regardless of capitalisation
+_NORMALIZED_LOCATION_MAPPING = {
+    location.casefold(): codes for location, codes in LOCATION_MAPPING.items()
+}
+
+# Shared default for locations without hydrophone codes
+_EMPTY = ()
+
 # Gmail API scopes
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Maximum number of requests Gmail accepts in one batch HTTP call
+GMAIL_BATCH_SIZE = 100
+
+# How long (seconds) a built Gmail service is trusted before the
+# credentials are checked for expiry again
+SERVICE_RECHECK_INTERVAL = 300
+
+# Format version of the state file written by GmailDivertParser; bump it
+# when parsing changes so stale results are discarded
+STATE_VERSION = 2
+
+# Reference point for _epoch_seconds
+_EPOCH = datetime(1970, 1, 1)
+
+# Body parts larger than this (bytes) are assumed to be attachments
+MAX_BODY_PART_SIZE = 1000000
+
+# Worker threads for fetching emails one by one when batch requests fail
+FALLBACK_FETCH_WORKERS = 10
+
+# Divert email timestamp in the subject (format: 2025_07_01 14:44)
+_TIMESTAMP_RE = re.compile(r'(\d{4}_\d{2}_\d{2}\s+\d{2}:\d{2})')
+
+# Location status lines in the body, e.g. "SoG_East: Bypass", and a second
+# pass for bracketed NC-DDS names, e.g. "[1] Barkley Cnyn: Divert". The
+# general pattern can run across lines without a colon, so the bracketed
+# pattern is applied separately rather than as an alternative
+_LOC_RE = re.compile(r'([A-Za-z0-9_\[\]\s]+):\s*(Bypass|Divert)', re.IGNORECASE)
+_BRACKETED_LOC_RE = re.compile(r'(\[[0-9]+\]\s*[A-Za-z0-9_\s]+):\s*(Bypass|Divert)', re.IGNORECASE)
+
+# Separator line ending the switch line-up: longer than 20 characters with
+# more than 10 underscores or more than 10 dashes
+_SEPARATOR_RE = re.compile(r'^(?=.{21})(?:(?:[^_\n]*_){11}|(?:[^-\n]*-){11})', re.MULTILINE)
+
+# Maximum number of characters of the switch line-up section that are parsed
+LINEUP_SCAN_CHARS = 8192
+
+def _walk_parts(payload):
+    """
+    Yield the leaf MIME parts of a Gmail message payload in document order.
+    
+    Nested multipart parts (e.g. multipart/alternative inside
+    multipart/mixed) are walked depth-first.
+    """
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if 'parts' in part:
+            stack.extend(reversed(part['parts']))
+        else:
+            yield part
+
+def _epoch_seconds(moment):
+    """
+    Convert a naive datetime to float seconds since 1970-01-01.
+    
+    Unlike datetime.timestamp() this ignores the local UTC offset, so
+    differences match plain datetime subtraction even across DST changes.
+    """
+    return (moment - _EPOCH).total_seconds()
+
+def _decode_body_data(data):
+    """Decode a base64url message body, returning None if it is malformed."""
+    try:
+        return base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+    except Exception:
+        return None
+
+def _is_divert_subject(subject):
+    """Check whether an email subject looks like a divert notification."""
+    return '[Divert]' in subject or 'DDS' in subject
+
+@dataclass(slots=True)
+class DivertPeriod:
+    """A continuous span during which a hydrophone kept one divert status."""
+    start: datetime
+    end: Optional[datetime]  # None while the period is ongoing
+    status: str
+    system: Optional[str]
+
 class GmailDivertParser:
     """Parses Gmail emails to extract divert status information for hydrophones."""
     
-    def __init__(self, credentials_path='credentials.json', token_path='token.json'):
+    def __init__(self, credentials_path='credentials.json', token_path='token.json', state_path=None):
         """
         Initialize the Gmail API client.
         
         Args:
             credentials_path: Path to Gmail API credentials file
             token_path: Path to store/retrieve access tokens
+            state_path: Path to store/retrieve emails parsed by earlier
+                updates, so only new emails are fetched (optional)
         """
         self.credentials_path = credentials_path
         self.token_path = token_path
+        self.state_path = state_path
         self.service = None
+        self.creds = None
+        self._service_checked_at = None  # time.monotonic() of the last credentials check
+        self._thread_local = threading.local()  # per-thread services for parallel fetches
         self.divert_history = []
         self.current_divert_status = {}
         
         # Historical divert periods tracking
-        self.divert_periods = {}  # location -> [{'start': datetime, 'end': datetime, 'system': str, 'status': str}, ...]
+        self.divert_periods = {}  # location -> [DivertPeriod, ...]
+        self._period_index = {}  # location -> prefix sums over its periods, built on first use
         
     def authenticate(self):
         """Authenticate with Gmail API using OAuth2."""
-        creds = None
+        creds = self.creds
         
-        # Load existing token if it exists
-        if os.path.exists(self.token_path):
+        # Load existing token if we don't already hold credentials in memory
+        if creds is None and os.path.exists(self.token_path):
             creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+        original_token = creds.to_json() if creds else None
             
         # If there are no valid credentials, get new ones
         if not creds or not creds.valid:
@@ -67,11 +174,39 @@ class GmailDivertParser:
                     self.credentials_path, SCOPES)
                 creds = flow.run_local_server(port=0)
                 
-            # Save credentials for next run
+        # Save credentials for next run, only if a refresh or new flow changed them
+        token_json = creds.to_json()
+        if token_json != original_token:
             with open(self.token_path, 'w') as token:
-                token.write(creds.to_json())
+                token.write(token_json)
                 
-        self.service = build('gmail', 'v1', credentials=creds)
+        # Reuse the built service unless the credentials object was replaced
+        if self.service is None or creds is not self.creds:
+            self.service = build('gmail', 'v1', credentials=creds)
+        self.creds = creds
+        self._service_checked_at = time.monotonic()
+        return True
+        
+    def _needs_authentication(self):
+        """
+        Check whether the Gmail service must be (re)built before use.
+        
+        Credentials are re-checked at most every SERVICE_RECHECK_INTERVAL
+        seconds, and only re-authenticated when they are no longer valid.
+        
+        Returns:
+            bool: True if authenticate() should be called
+        """
+        if not self.service:
+            return True
+        if self.creds is None:
+            # Service was supplied directly rather than built by authenticate()
+            return False
+        if time.monotonic() - self._service_checked_at < SERVICE_RECHECK_INTERVAL:
+            return False
+        if self.creds.valid:
+            self._service_checked_at = time.monotonic()
+            return False
         return True
         
     def search_divert_emails(self, days_back=30):
@@ -89,11 +224,12 @@ class GmailDivertParser:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days_back)
             
-            # Format dates for Gmail search (YYYY/MM/DD)
-            start_date_str = start_date.strftime('%Y/%m/%d')
-            
-            # Gmail search query for divert emails
-            query = f'subject:"[Divert]" OR subject:"DDS" after:{start_date_str}'
+            # Gmail search query for divert emails; after: takes epoch seconds
+            # for an exact window, and promotions/social mail is excluded
+            query = (
+                f'(subject:"[Divert]" OR subject:"DDS") after:{int(start_date.timestamp())} '
+                '-category:promotions -category:social'
+            )
             
             result = self.service.users().messages().list(
                 userId='me', 
@@ -110,74 +246,175 @@ class GmailDivertParser:
             print(f"Gmail API error: {error}")
             return []
             
-    def get_email_content(self, message_id):
+    def get_email_content(self, message_id, service=None):
         """
         Get the content of a specific email.
         
         Args:
             message_id: Gmail message ID
+            service: Gmail service to use (defaults to self.service)
             
         Returns:
             Tuple of (subject, body, date)
         """
+        service = service or self.service
         try:
-            message = self.service.users().messages().get(
+            message = service.users().messages().get(
                 userId='me', 
                 id=message_id,
                 format='full'
             ).execute()
             
-            # Extract headers
-            headers = message['payload'].get('headers', [])
+            return self._extract_email_content(message)
+            
+        except HttpError as error:
+            print(f"Error retrieving email {message_id}: {error}")
+            return '', '', ''
+            
+    def _get_email_content_threaded(self, message_id):
+        """
+        Get the content of a specific email from a worker thread.
+        
+        httplib2.Http is not thread-safe, so each thread builds and reuses
+        its own Gmail service from the shared credentials.
+        
+        Args:
+            message_id: Gmail message ID
+            
+        Returns:
+            Tuple of (subject, body, date)
+        """
+        if self.creds is None:
+            # Service was supplied directly rather than built by authenticate()
+            return self.get_email_content(message_id)
+        
+        service = getattr(self._thread_local, 'service', None)
+        if service is None:
+            service = build('gmail', 'v1', credentials=self.creds, cache_discovery=False)
+            self._thread_local.service = service
+        return self.get_email_content(message_id, service=service)
+        
+    def get_email_contents(self, message_ids):
+        """
+        Get the content of several emails using batched Gmail API requests.
+        
+        Up to GMAIL_BATCH_SIZE message fetches are sent per HTTP round trip.
+        
+        Args:
+            message_ids: Iterable of Gmail message IDs
+            
+        Returns:
+            Dict of {message_id: (subject, body, date)}; messages that could
+            not be retrieved are omitted
+            
+        Raises:
+            HttpError: If a batch request as a whole fails
+        """
+        return self._batch_get_messages(message_ids, self._extract_email_content, format='full')
+        
+    def _fetch_headers_batch(self, message_ids):
+        """
+        Get only the Subject and Date headers of several emails.
+        
+        Uses format='metadata' so no message bodies or attachments are
+        downloaded.
+        
+        Args:
+            message_ids: Iterable of Gmail message IDs
+            
+        Returns:
+            Dict of {message_id: (subject, date)}; messages that could not
+            be retrieved are omitted
+            
+        Raises:
+            HttpError: If a batch request as a whole fails
+        """
+        def extract_headers(message):
+            headers = message.get('payload', {}).get('headers', [])
             subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
             date = next((h['value'] for h in headers if h['name'] == 'Date'), '')
+            return subject, date
+        
+        return self._batch_get_messages(
+            message_ids, extract_headers, format='metadata', metadataHeaders=['Subject', 'Date'])
+        
+    def _batch_get_messages(self, message_ids, extract, **get_params):
+        """
+        Run messages.get for several emails in batches of GMAIL_BATCH_SIZE.
+        
+        Args:
+            message_ids: Iterable of Gmail message IDs
+            extract: Function applied to each retrieved message resource
+            **get_params: Extra parameters for messages.get (e.g. format)
             
-            # Extract body
-            body = ''
-            payload = message.get('payload', {})
+        Returns:
+            Dict of {message_id: extract(message)}; messages that could not
+            be retrieved are omitted
             
-            if 'parts' in payload:
-                for i, part in enumerate(payload['parts']):
-                    part_size = part.get('body', {}).get('size', 0)
-                    
-                    # Skip very large parts (likely attachments)
-                    if part_size > 1000000:  # 1MB limit
-                        continue
-                        
-                    if part['mimeType'] == 'text/plain':
-                        data = part['body'].get('data', '')
-                        if data:
-                            try:
-                                body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                                break
-                            except Exception:
-                                continue
-                
-                # If no text/plain found, try text/html as fallback
-                if not body:
-                    for i, part in enumerate(payload['parts']):
-                        if part['mimeType'] == 'text/html' and part.get('body', {}).get('size', 0) < 1000000:
-                            data = part['body'].get('data', '')
-                            if data:
-                                try:
-                                    body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                                    break
-                                except Exception:
-                                    continue
-            else:
-                if payload.get('mimeType') == 'text/plain':
-                    data = payload.get('body', {}).get('data', '')
-                    if data:
-                        try:
-                            body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                        except Exception:
-                            pass
-                    
-            return subject, body, date
+        Raises:
+            HttpError: If a batch request as a whole fails
+        """
+        results = {}
+        
+        def on_message(request_id, response, exception):
+            if exception is not None:
+                print(f"Error retrieving email {request_id}: {exception}")
+                return
+            results[request_id] = extract(response)
+        
+        message_ids = list(message_ids)
+        for i in range(0, len(message_ids), GMAIL_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_message)
+            for message_id in message_ids[i:i + GMAIL_BATCH_SIZE]:
+                batch.add(
+                    self.service.users().messages().get(userId='me', id=message_id, **get_params),
+                    request_id=message_id
+                )
+            batch.execute()
+            
+        return results
+            
+    def _extract_email_content(self, message):
+        """
+        Extract subject, body and date from a Gmail API message resource.
+        
+        Args:
+            message: Message resource fetched with format='full'
             
-        except HttpError as error:
-            print(f"Error retrieving email {message_id}: {error}")
-            return '', '', ''
+        Returns:
+            Tuple of (subject, body, date)
+        """
+        # Extract headers
+        headers = message['payload'].get('headers', [])
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
+        date = next((h['value'] for h in headers if h['name'] == 'Date'), '')
+        
+        # Extract body: the first text/plain part, else the first decodable
+        # text/html part, skipping very large parts (likely attachments)
+        body = None
+        html_parts = []
+        
+        for part in _walk_parts(message.get('payload', {})):
+            part_body = part.get('body', {})
+            data = part_body.get('data', '')
+            if not data or part_body.get('size', 0) > MAX_BODY_PART_SIZE:
+                continue
+                
+            if part.get('mimeType') == 'text/plain':
+                body = _decode_body_data(data)
+                if body is not None:
+                    break
+            elif part.get('mimeType') == 'text/html':
+                html_parts.append(data)
+        
+        # If no text/plain found, try text/html as fallback
+        if body is None:
+            for data in html_parts:
+                body = _decode_body_data(data)
+                if body is not None:
+                    break
+                
+        return subject, body or '', date
             
     def parse_divert_email(self, subject, body, date_str):
         """
@@ -195,12 +432,12 @@ class GmailDivertParser:
             'timestamp': None,
             'system': None,
             'locations': {},  # location -> status mapping
-            'raw_subject': subject,
-            'raw_body': body
+            'hydrophone_status': {},  # hydrophone code -> status mapping
+            'raw_subject': subject
         }
         
         # Parse timestamp from subject (format: 2025_07_01 14:44)
-        timestamp_match = re.search(r'(\d{4}_\d{2}_\d{2}\s+\d{2}:\d{2})', subject)
+        timestamp_match = _TIMESTAMP_RE.search(subject)
         if timestamp_match:
             try:
                 timestamp_str = timestamp_match.group(1).replace('_', '-')
@@ -218,39 +455,26 @@ class GmailDivertParser:
         
         # Parse body for location status information
         # Look for "New Switch Line-Up:" section
-        if 'New Switch Line-Up:' in body:
+        _, lineup_header, lineup_section = body.partition('New Switch Line-Up:')
+        if lineup_header:
             try:
-                # Find the section after "New Switch Line-Up:"
-                lineup_start = body.find('New Switch Line-Up:')
-                if lineup_start != -1:
-                    # Get text after the lineup section
-                    lineup_section = body[lineup_start:]
-                    
-                    # Stop parsing at lines with many underscores/dashes (separators)
-                    lines = lineup_section.split('\n')
-                    relevant_lines = []
-                    
-                    for line in lines[1:]:  # Skip the "New Switch Line-Up:" line itself
-                        # Stop if we hit a separator line
-                        if len(line) > 20 and (line.count('_') > 10 or line.count('-') > 10):
-                            break
-                        relevant_lines.append(line)
-                    
-                    # Join back and process
-                    relevant_text = '\n'.join(relevant_lines)
-                    
-                    # Look for patterns like:
-                    # SoG_East: Bypass
-                    # SoG_Delta: Divert
-                    # [1] Barkley Cnyn: Divert
-                    location_patterns = [
-                        r'([A-Za-z0-9_\[\]\s]+):\s*(Bypass|Divert)',
-                        r'(\[[0-9]+\]\s*[A-Za-z0-9_\s]+):\s*(Bypass|Divert)',
-                    ]
-                    
-                    for pattern in location_patterns:
-                        matches = re.finditer(pattern, relevant_text, re.MULTILINE | re.IGNORECASE)
-                        for match in matches:
+                # Skip the rest of the "New Switch Line-Up:" line itself and
+                # only scan a bounded window of the section after it
+                section_start = lineup_section.find('\n') + 1
+                section_end = min(len(lineup_section), section_start + LINEUP_SCAN_CHARS)
+                
+                # Stop parsing at lines with many underscores/dashes (separators)
+                separator = _SEPARATOR_RE.search(lineup_section, section_start, section_end)
+                if separator:
+                    section_end = separator.start()
+                
+                # Look for patterns like:
+                # SoG_East: Bypass
+                # SoG_Delta: Divert
+                # [1] Barkley Cnyn: Divert
+                if section_start:
+                    for pattern in (_LOC_RE, _BRACKETED_LOC_RE):
+                        for match in pattern.finditer(lineup_section, section_start, section_end):
                             location = match.group(1).strip()
                             status = match.group(2).strip()
                             parsed_info['locations'][location] = status
@@ -260,6 +484,9 @@ class GmailDivertParser:
                 # Don't fail completely, just log the error
                 pass
         
+        # Map email locations to hydrophone codes once, for all consumers
+        parsed_info['hydrophone_status'] = self.map_locations_to_hydrophones(parsed_info['locations'])
+        
         return parsed_info
     
     def map_locations_to_hydrophones(self, email_locations):
@@ -275,14 +502,117 @@ class GmailDivertParser:
         hydrophone_status = {}
         
         for email_location, status in email_locations.items():
-            # Look up in LOCATION_MAPPING
-            hydrophone_codes = LOCATION_MAPPING.get(email_location, [])
+            # Look up in LOCATION_MAPPING (case-insensitively)
+            hydrophone_codes = _NORMALIZED_LOCATION_MAPPING.get(email_location.casefold(), _EMPTY)
             
             for code in hydrophone_codes:
                 hydrophone_status[code] = status
                 
         return hydrophone_status
     
+    def _fetch_divert_emails(self, message_ids):
+        """
+        Fetch the content of the divert emails among the given messages.
+        
+        Headers are fetched first and full emails are downloaded only for
+        divert subjects, falling back to one request per email (in parallel
+        threads) if a batch fails.
+        
+        Args:
+            message_ids: List of Gmail message IDs
+            
+        Returns:
+            Dict of {message_id: (subject, body, date)}, with None for emails
+            that are not divert notifications; emails that could not be
+            retrieved are omitted
+        """
+        try:
+            headers = self._fetch_headers_batch(message_ids)
+            contents = {
+                message_id: None for message_id, (subject, _) in headers.items()
+                if not _is_divert_subject(subject)
+            }
+            divert_ids = [
+                message_id for message_id in message_ids
+                if message_id in headers and message_id not in contents
+            ]
+            contents.update(self.get_email_contents(divert_ids))
+        except HttpError as error:
+            print(f"Batch email retrieval failed ({error}), fetching emails individually")
+            contents = {}
+            with ThreadPoolExecutor(max_workers=FALLBACK_FETCH_WORKERS) as executor:
+                fetched = executor.map(self._get_email_content_threaded, message_ids)
+                for message_id, content in zip(message_ids, fetched):
+                    subject = content[0]
+                    if subject:  # Empty subject means the email could not be retrieved
+                        contents[message_id] = content if _is_divert_subject(subject) else None
+                        
+        return contents
+    
+    def _load_state(self):
+        """
+        Load the emails parsed by earlier updates from state_path.
+        
+        Returns:
+            Dict of {message_id: parsed_info}, with None for emails that are
+            not divert notifications; empty if there is no usable state
+        """
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+            
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('version') != STATE_VERSION:
+                return {}
+                
+            known_emails = {}
+            for message_id, email_info in state['emails'].items():
+                if email_info is not None:
+                    timestamp = email_info['timestamp']
+                    email_info['timestamp'] = datetime.fromisoformat(timestamp) if timestamp else None
+                    # Re-mapped on load so LOCATION_MAPPING changes take effect
+                    email_info['hydrophone_status'] = self.map_locations_to_hydrophones(email_info['locations'])
+                known_emails[message_id] = email_info
+            return known_emails
+            
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            print(f"Ignoring unreadable divert state file {self.state_path}: {error}")
+            return {}
+    
+    def _save_state(self, emails):
+        """
+        Save parsed emails to state_path for the next update.
+        
+        Args:
+            emails: Dict of {message_id: parsed_info or None}
+        """
+        if not self.state_path:
+            return
+            
+        state = {
+            'version': STATE_VERSION,
+            'emails': {
+                message_id: None if email_info is None else {
+                    'timestamp': email_info['timestamp'].isoformat() if email_info['timestamp'] else None,
+                    'system': email_info['system'],
+                    'locations': email_info['locations'],
+                    'raw_subject': email_info['raw_subject']
+                }
+                for message_id, email_info in emails.items()
+            }
+        }
+        
+        # Write to a temporary file first so an interrupted write can't
+        # leave a truncated state file behind
+        temp_path = f"{self.state_path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as error:
+            print(f"Could not save divert state to {self.state_path}: {error}")
+    
     def update_divert_status(self, days_back=7):
         """
         Update divert status by parsing recent emails.
@@ -293,55 +623,82 @@ class GmailDivertParser:
         Returns:
             Dict with updated status information
         """
-        if not self.service:
+        if self._needs_authentication():
             self.authenticate()
             
         # Search for divert emails
         messages = self.search_divert_emails(days_back)
         
-        parsed_emails = []
-        
-        for message in messages:
-            message_id = message['id']
-            subject, body, date = self.get_email_content(message_id)
-            
-            if subject and ('[Divert]' in subject or 'DDS' in subject):
-                parsed_info = self.parse_divert_email(subject, body, date)
-                if parsed_info['locations']:  # Only include if we found locations
-                    parsed_emails.append(parsed_info)
+        message_ids = [message['id'] for message in messages]
         
-        # Sort by timestamp (newest first)
-        parsed_emails.sort(key=lambda x: x['timestamp'] or datetime.min, reverse=True)
+        # Reuse emails parsed by earlier updates and only fetch the new ones
+        known_emails = self._load_state()
+        contents = self._fetch_divert_emails(
+            [message_id for message_id in message_ids if message_id not in known_emails])
         
-        # Update current status based on most recent info per location
+        parsed_emails = []
+        state_emails = {}
+        
+        for message_id in message_ids:
+            if message_id in known_emails:
+                parsed_info = known_emails[message_id]
+            elif message_id in contents:
+                parsed_info = None
+                if contents[message_id] is not None:
+                    subject, body, date = contents[message_id]
+                    parsed_info = self.parse_divert_email(subject, body, date)
+                    if not parsed_info['locations']:  # Only include if we found locations
+                        parsed_info = None
+            else:
+                # Could not be retrieved; try again on the next update
+                continue
+                
+            state_emails[message_id] = parsed_info
+            if parsed_info is not None:
+                parsed_emails.append(parsed_info)
+        
+        # search_divert_emails returns no messages on an API error; keep the
+        # saved emails rather than replacing them with an empty state
+        if message_ids or not known_emails:
+            self._save_state(state_emails)
+        
+        # Sort by timestamp (oldest first; emails without one go first).
+        # Gmail lists newest first and subject timestamps only resolve to the
+        # minute, so reverse before the stable sort to keep the newest email
+        # last among ties
+        parsed_emails.reverse()
+        parsed_emails.sort(key=lambda x: x['timestamp'] or datetime.min)
+        
+        # Single forward-time pass: the last email seen for a code sets its
+        # current status, and each status change opens a new historical period
         self.current_divert_status = {}
-        location_timestamps = {}
+        self.divert_periods = {}
+        self._period_index = {}
         
         for email_info in parsed_emails:
-            email_locations = email_info['locations']
             timestamp = email_info['timestamp']
             system = email_info['system']
             
-            # Map email locations to hydrophone codes
-            hydrophone_status = self.map_locations_to_hydrophones(email_locations)
-            
-            for hydrophone_code, status in hydrophone_status.items():
-                # Only update if this is newer than what we have
-                if (hydrophone_code not in location_timestamps or 
-                    (timestamp and timestamp > location_timestamps[hydrophone_code])):
+            for hydrophone_code, status in email_info['hydrophone_status'].items():
+                self.current_divert_status[hydrophone_code] = {
+                    'status': status,
+                    'timestamp': timestamp,
+                    'system': system
+                }
+                
+                if timestamp is None:
+                    continue
                     
-                    self.current_divert_status[hydrophone_code] = {
-                        'status': status,
-                        'timestamp': timestamp,
-                        'system': system
-                    }
-                    location_timestamps[hydrophone_code] = timestamp
-        
-        # Store parsed emails for history
-        self.divert_history = parsed_emails
+                periods = self.divert_periods.setdefault(hydrophone_code, [])
+                if not periods or periods[-1].status != status:
+                    # Status changed, close current period and start new one
+                    if periods:
+                        periods[-1].end = timestamp
+                    periods.append(DivertPeriod(start=timestamp, end=None, status=status, system=system))
         
-        # Calculate historical periods
-        self._calculate_divert_periods()
+        # Store parsed emails for history (newest first)
+        parsed_emails.reverse()
+        self.divert_history = parsed_emails
         
         return {
             'emails_processed': len(parsed_emails),
@@ -394,68 +751,6 @@ class GmailDivertParser:
             'events_processed': events_processed
         }
     
-    def _calculate_divert_periods(self):
-        """Calculate historical divert periods from parsed emails."""
-        # Group events by location and sort by timestamp
-        location_events = {}
-        
-        for email_info in self.divert_history:
-            if not email_info['timestamp']:
-                continue
-                
-            email_locations = email_info['locations']
-            hydrophone_status = self.map_locations_to_hydrophones(email_locations)
-            
-            for location, status in hydrophone_status.items():
-                if location not in location_events:
-                    location_events[location] = []
-                    
-                location_events[location].append({
-                    'timestamp': email_info['timestamp'],
-                    'status': status,
-                    'system': email_info['system']
-                })
-        
-        # Sort events by timestamp for each location
-        for location in location_events:
-            location_events[location].sort(key=lambda x: x['timestamp'])
-        
-        # Calculate periods for each location
-        self.divert_periods = {}
-        
-        for location, events in location_events.items():
-            periods = []
-            current_period = None
-            
-            for event in events:
-                if current_period is None:
-                    # Start new period
-                    current_period = {
-                        'start': event['timestamp'],
-                        'end': None,
-                        'status': event['status'],
-                        'system': event['system']
-                    }
-                elif current_period['status'] != event['status']:
-                    # Status changed, close current period and start new one
-                    current_period['end'] = event['timestamp']
-                    periods.append(current_period)
-                    
-                    current_period = {
-                        'start': event['timestamp'],
-                        'end': None,
-                        'status': event['status'],
-                        'system': event['system']
-                    }
-                # If status is the same, just update the current period timestamp
-                # (end time will be set when status changes or period ends)
-            
-            # Add final period if exists
-            if current_period:
-                periods.append(current_period)
-            
-            self.divert_periods[location] = periods
-    
     def get_divert_periods(self, location_code, start_date=None, end_date=None):
         """
         Get divert periods for a specific location within a date range.
@@ -466,15 +761,15 @@ class GmailDivertParser:
             end_date: End date filter (datetime object, optional)
             
         Returns:
-            List of divert periods
+            List of DivertPeriod
         """
         periods = self.divert_periods.get(location_code, [])
         
         if start_date or end_date:
             filtered_periods = []
             for period in periods:
-                period_start = period['start']
-                period_end = period['end'] or datetime.now()
+                period_start = period.start
+                period_end = period.end or datetime.now()
                 
                 # Check if period overlaps with requested range
                 if start_date and period_end < start_date:
@@ -487,10 +782,48 @@ class GmailDivertParser:
         
         return periods
     
+    def _build_period_index(self, periods):
+        """
+        Build prefix sums over a location's periods for get_divert_statistics.
+        
+        Times are held as float epoch seconds (see _epoch_seconds) so the
+        statistics avoid datetime/timedelta arithmetic.
+        
+        Args:
+            periods: The location's periods, oldest first; each period ends
+                where the next one starts and only the last one is open
+            
+        Returns:
+            Tuple of (starts, ends, divert_seconds, bypass_seconds,
+            divert_count, bypass_count); ends is None for the open period,
+            and element i of each cumulative list totals the non-empty
+            closed periods before index i (len(periods) + 1 entries)
+        """
+        starts = [_epoch_seconds(period.start) for period in periods]
+        ends = [_epoch_seconds(period.end) if period.end else None for period in periods]
+        divert_seconds, bypass_seconds = [0.0], [0.0]
+        divert_count, bypass_count = [0], [0]
+        
+        for period, start, end in zip(periods, starts, ends):
+            # The open (last) period's length depends on the query time
+            duration = end - start if end is not None else 0.0
+            is_divert = duration > 0 and period.status == 'Divert'
+            is_bypass = duration > 0 and period.status == 'Bypass'
+            divert_seconds.append(divert_seconds[-1] + duration if is_divert else divert_seconds[-1])
+            bypass_seconds.append(bypass_seconds[-1] + duration if is_bypass else bypass_seconds[-1])
+            divert_count.append(divert_count[-1] + is_divert)
+            bypass_count.append(bypass_count[-1] + is_bypass)
+            
+        return starts, ends, divert_seconds, bypass_seconds, divert_count, bypass_count
+    
     def get_divert_statistics(self, location_code, start_date=None, end_date=None):
         """
         Get divert statistics for a location within a date range.
         
+        Periods lying entirely inside the range are totalled from prefix
+        sums, so only the (at most few) periods straddling its edges are
+        walked individually.
+        
         Args:
             location_code: Hydrophone location code
             start_date: Start date filter (datetime object, optional)
@@ -499,46 +832,77 @@ class GmailDivertParser:
         Returns:
             Dict with statistics
         """
-        periods = self.get_divert_periods(location_code, start_date, end_date)
-        
-        total_divert_time = timedelta()
-        total_bypass_time = timedelta()
-        divert_periods_count = 0
-        bypass_periods_count = 0
-        
-        analysis_start = start_date or (min(p['start'] for p in periods) if periods else datetime.now())
-        analysis_end = end_date or datetime.now()
-        
-        for period in periods:
-            period_start = max(period['start'], analysis_start)
-            period_end = min(period['end'] or datetime.now(), analysis_end)
+        periods = self.divert_periods.get(location_code, [])
+        index = self._period_index.get(location_code)
+        if index is None:
+            index = self._period_index[location_code] = self._build_period_index(periods)
+        starts, ends, cum_divert_seconds, cum_bypass_seconds, cum_divert_count, cum_bypass_count = index
+        
+        now = datetime.now()
+        now_s = _epoch_seconds(now)
+        start_s = _epoch_seconds(start_date) if start_date else None
+        end_s = _epoch_seconds(end_date) if end_date else None
+        count = len(periods)
+        
+        # Closed periods overlapping [start_date, end_date] form a contiguous
+        # run [first, stop) since period i ends where period i + 1 starts; the
+        # open last period ends "now" and is checked on its own
+        first = bisect_left(starts, start_s, 1, count) - 1 if start_date and count else 0
+        stop = min(bisect_right(starts, end_s), count - 1) if end_date else count - 1
+        if count and not (start_date and now_s < start_s) and not (end_date and starts[-1] > end_s):
+            stop = count
+        stop = max(stop, first)
+        
+        if start_date:
+            analysis_start, analysis_start_s = start_date, start_s
+        elif stop > first:
+            analysis_start, analysis_start_s = periods[first].start, starts[first]
+        else:
+            analysis_start, analysis_start_s = now, now_s
+        analysis_end, analysis_end_s = (end_date, end_s) if end_date else (now, now_s)
+        
+        # Closed periods lying entirely within the analysis window
+        inner_start = bisect_left(starts, analysis_start_s, first, stop)
+        inner_stop = max(inner_start, min(bisect_right(starts, analysis_end_s, 1) - 1, stop))
+        
+        total_divert_seconds = cum_divert_seconds[inner_stop] - cum_divert_seconds[inner_start]
+        total_bypass_seconds = cum_bypass_seconds[inner_stop] - cum_bypass_seconds[inner_start]
+        divert_periods_count = cum_divert_count[inner_stop] - cum_divert_count[inner_start]
+        bypass_periods_count = cum_bypass_count[inner_stop] - cum_bypass_count[inner_start]
+        
+        # Periods straddling the window edges are clipped individually
+        for i in chain(range(first, inner_start), range(inner_stop, stop)):
+            period_start = max(starts[i], analysis_start_s)
+            period_end = min(ends[i] if ends[i] is not None else now_s, analysis_end_s)
             
             if period_end <= period_start:
                 continue
                 
             duration = period_end - period_start
+            status = periods[i].status
             
-            if period['status'] == 'Divert':
-                total_divert_time += duration
+            if status == 'Divert':
+                total_divert_seconds += duration
                 divert_periods_count += 1
-            elif period['status'] == 'Bypass':
-                total_bypass_time += duration
+            elif status == 'Bypass':
+                total_bypass_seconds += duration
                 bypass_periods_count += 1
         
         total_analysis_time = analysis_end - analysis_start
+        total_analysis_seconds = analysis_end_s - analysis_start_s
         
         return {
             'location_code': location_code,
             'analysis_start': analysis_start,
             'analysis_end': analysis_end,
             'total_analysis_time': total_analysis_time,
-            'total_divert_time': total_divert_time,
-            'total_bypass_time': total_bypass_time,
-            'divert_percentage': (total_divert_time.total_seconds() / total_analysis_time.total_seconds() * 100) if total_analysis_time.total_seconds() > 0 else 0,
-            'bypass_percentage': (total_bypass_time.total_seconds() / total_analysis_time.total_seconds() * 100) if total_analysis_time.total_seconds() > 0 else 0,
+            'total_divert_time': timedelta(seconds=total_divert_seconds),
+            'total_bypass_time': timedelta(seconds=total_bypass_seconds),
+            'divert_percentage': (total_divert_seconds / total_analysis_seconds * 100) if total_analysis_seconds > 0 else 0,
+            'bypass_percentage': (total_bypass_seconds / total_analysis_seconds * 100) if total_analysis_seconds > 0 else 0,
             'divert_periods_count': divert_periods_count,
             'bypass_periods_count': bypass_periods_count,
-            'total_periods': len(periods)
+            'total_periods': stop - first
         }
     
     def get_all_divert_periods(self, start_date=None, end_date=None):
@@ -550,7 +914,7 @@ class GmailDivertParser:
             end_date: End date filter (datetime object, optional)
             
         Returns:
-            Dict of {location_code: [periods]}
+            Dict of {location_code: [DivertPeriod, ...]}
         """
         all_periods = {}
         
@@ -7,60 +7,159 @@ hydrophonedatarequests GitHub repo discovery interface.
 
 import os
 import re
-from datetime import datetime, timedelta
+import sys
+import json
+import functools
+import time
+import tempfile
+from datetime import date, datetime, timedelta
 from onc.onc import ONC
 from dotenv import load_dotenv
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables
 load_dotenv()
 
+# How long (seconds) a cached location list is reused
+LOCATIONS_CACHE_TTL = 24 * 60 * 60
+
+# Concurrent getDeployments requests when fetching per-device deployments
+DEPLOYMENT_FETCH_WORKERS = 16
+
+# Citation parsing patterns, e.g. "... 2019. Barkley Canyon Hydrophone Deployed 2019-05-02 ..."
+_CITATION_RE = re.compile(r'\.\s*\d{4}\.\s*(.*?)(?:\s+Hydrophone)?\s+Deployed\s+\d{4}-\d{2}-\d{2}', re.IGNORECASE)
+_CITATION_SIMPLE_RE = re.compile(r'\.\s*\d{4}\.\s*(.*)')
+_YEAR_RE = re.compile(r'\b\d{4}\b')
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_DOI_RE = re.compile(r'https?://doi\.org', re.IGNORECASE)
+_HYDRO_DEPLOY_RE = re.compile(r'\s+Hydrophone\s+Deployed.*$', re.IGNORECASE)
+_DEPLOY_RE = re.compile(r'\s+Deployed.*$', re.IGNORECASE)
+_TRAIL_PUNCT = '.,;:!?)('
+_GENERIC_CITATION_NAMES = frozenset({"hydrophone", "underwater network"})
+_ODP_RE = re.compile(r'ODP', re.IGNORECASE)  # Ocean Drilling Program site names
+
+@functools.lru_cache(maxsize=2048)
 def extract_name_from_citation(citation_string):
-    """Extract a location name from the citation string, avoiding generic terms."""
+    """
+    Extract a location name from the citation string, avoiding generic terms.
+    
+    Memoized, since many deployments share the same citation string.
+    """
     if not citation_string:
         return None
 
     # Try to find patterns like "... YYYY. [Location Name] Hydrophone Deployed YYYY-MM-DD..."
-    match = re.search(r'\.\s*\d{4}\.\s*(.*?)(?:\s+Hydrophone)?\s+Deployed\s+\d{4}-\d{2}-\d{2}', citation_string, re.IGNORECASE)
-
-    if match:
-        potential_name = match.group(1).strip()
-        # Avoid overly generic terms
-        if potential_name and potential_name.lower() not in ["hydrophone", "underwater network"]:
-            potential_name = potential_name.rstrip('.,;:!?)(')
-            return potential_name
-
-    # Fallback: Simpler pattern if the above fails
-    match_simple = re.search(r'\.\s*\d{4}\.\s*(.*)', citation_string)
-    if match_simple:
+    match = _CITATION_RE.search(citation_string)
+    potential_name = match.group(1).strip() if match else None
+
+    # Fallback: Simpler pattern if the above fails or gives a generic term;
+    # it also needs a year, so citations without one can stop here
+    if not potential_name or potential_name.lower() in _GENERIC_CITATION_NAMES:
+        if not _YEAR_RE.search(citation_string):
+            return None
+        match_simple = _CITATION_SIMPLE_RE.search(citation_string)
+        if not match_simple:
+            return None
         potential_name = match_simple.group(1).strip()
         
         # Remove trailing date/doi parts
-        date_match = re.search(r'\d{4}-\d{2}-\d{2}', potential_name)
+        date_match = _DATE_RE.search(potential_name)
         if date_match:
             potential_name = potential_name[:date_match.start()].strip()
         
-        doi_match = re.search(r'https?://doi.org', potential_name, re.IGNORECASE)
+        doi_match = _DOI_RE.search(potential_name)
         if doi_match:
             potential_name = potential_name[:doi_match.start()].strip()
 
         # Remove trailing hydrophone/deployment info
-        potential_name = re.sub(r'\s+Hydrophone\s+Deployed.*$', '', potential_name, flags=re.IGNORECASE).strip()
-        potential_name = re.sub(r'\s+Deployed.*$', '', potential_name, flags=re.IGNORECASE).strip()
-        potential_name = potential_name.rstrip('.,;:!?)(')
+        potential_name = _HYDRO_DEPLOY_RE.sub('', potential_name).strip()
+        potential_name = _DEPLOY_RE.sub('', potential_name).strip()
 
-        if potential_name and potential_name.lower() not in ["hydrophone", "underwater network"]:
-            return potential_name
+    # Trim trailing punctuation once, then avoid overly generic terms
+    potential_name = potential_name.rstrip(_TRAIL_PUNCT)
+    if potential_name and potential_name.lower() not in _GENERIC_CITATION_NAMES:
+        return potential_name
 
     return None
 
-def list_hydrophone_locations():
+def _fetch_deployments(onc, device_code, base_params):
+    """Get a device's deployments, returning an empty list (with a warning) on failure."""
+    try:
+        return onc.getDeployments({'deviceCode': device_code, **base_params})
+    except Exception as e:
+        print(f"   Warning: Could not get deployments for {device_code}: {e}")
+        return []
+
+def _print_locations(sorted_locations, odp_sites=None):
+    """
+    Display discovered locations in GitHub repo format, plus any ODP sites.
+    
+    Args:
+        sorted_locations: Location dicts ordered by locationCode
+        odp_sites: ODP site locations, if already collected; found from
+            sorted_locations otherwise
+    """
+    print(f"\n2a. Select Location:")
+    print("=" * 80)
+    
+    # Write each listing in one call rather than one print per location
+    sys.stdout.write(''.join(
+        f"{loc['locationName']} [{loc['locationCode']}] (Devs: {loc['deviceCount']})\n"
+        for loc in sorted_locations))
+    
+    print(f"\n✅ Discovery complete! Found {len(sorted_locations)} locations with hydrophone data")
+    
+    # Also show any ODP sites found
+    if odp_sites is None:
+        odp_sites = [loc for loc in sorted_locations if _ODP_RE.search(loc['locationName'])]
+    if odp_sites:
+        print(f"\n🎯 ODP Sites found:")
+        sys.stdout.write(''.join(
+            f"   {odp['locationName']} [{odp['locationCode']}]\n" for odp in odp_sites))
+    sys.stdout.flush()
+
+def _load_cached_locations(cache_path):
+    """Return the cached location list, or None if missing, stale or unreadable."""
+    try:
+        if time.time() - os.path.getmtime(cache_path) >= LOCATIONS_CACHE_TTL:
+            return None
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_cached_locations(cache_path, locations):
+    """Write the location list to the cache, replacing any previous file atomically."""
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(locations, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"   Warning: Could not cache location list: {e}")
+
+def list_hydrophone_locations(force_refresh=False):
     """
     List all locations with hydrophone data using the same approach as the GitHub repo
+    
+    Results are cached in the temp directory for LOCATIONS_CACHE_TTL seconds,
+    since ONC location metadata changes at most daily.
+    
+    Args:
+        force_refresh: Ignore any cached results and query the ONC API
     """
     print("Hydrophone Location Discovery")
     print("=" * 50)
     
+    cache_path = os.path.join(tempfile.gettempdir(), f"onc_locations_{date.today().isoformat()}.json")
+    if not force_refresh:
+        cached_locations = _load_cached_locations(cache_path)
+        if cached_locations is not None:
+            print(f"📦 Using cached location list ({cache_path})")
+            _print_locations(cached_locations)
+            return cached_locations
+    
     # Get ONC token
     token = os.getenv('ONC_TOKEN')
     if not token:
@@ -75,8 +174,10 @@ def list_hydrophone_locations():
         # Step 1: Get location map first (needed for display names)
         print("   Getting location map...")
         loc_response = onc.getLocations({})
-        loc_map = {loc.get('locationCode'): loc.get('locationName', '') 
-                   for loc in loc_response if isinstance(loc, dict)}
+        # Skip entries without a location code so they cannot collide on a None key
+        loc_map = {code: loc.get('locationName', '')
+                   for loc in loc_response
+                   if isinstance(loc, dict) and (code := loc.get('locationCode'))}
         print(f"   Found {len(loc_map)} locations in map")
         
         # Step 2: Get all hydrophones (this is the key difference from the original approach)
@@ -101,27 +202,38 @@ def list_hydrophone_locations():
         # Use a broad date range to capture all historical deployments
         date_from = (datetime.now() - timedelta(days=365*5)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
         date_to = datetime.now().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        base_params = {'dateFrom': date_from, 'dateTo': date_to}
         
-        for device in all_hydrophones:
-            device_code = device.get('deviceCode')
-            if not device_code:
-                continue
-                
-            try:
-                deployments = onc.getDeployments({
-                    'deviceCode': device_code,
-                    'dateFrom': date_from,
-                    'dateTo': date_to
-                })
-                all_deployments.extend(deployments)
-            except Exception as e:
-                print(f"   Warning: Could not get deployments for {device_code}: {e}")
-                continue
+        device_codes = [device.get('deviceCode') for device in all_hydrophones if device.get('deviceCode')]
+        
+        # One bulk request for the whole device category, grouped by device
+        deployments_by_device = defaultdict(list)
+        try:
+            bulk_deployments = onc.getDeployments({'deviceCategoryCode': 'HYDROPHONE', **base_params})
+            for deployment in bulk_deployments:
+                deployments_by_device[deployment.get('deviceCode')].append(deployment)
+        except Exception as e:
+            print(f"   Warning: Bulk deployment request failed, querying each device: {e}")
+        
+        # Fall back to per-device requests for devices missing from the bulk
+        # result; they are independent and network-bound, so run concurrently
+        missing_codes = [device_code for device_code in device_codes if device_code not in deployments_by_device]
+        with ThreadPoolExecutor(max_workers=DEPLOYMENT_FETCH_WORKERS) as executor:
+            for device_code, deployments in zip(missing_codes, executor.map(
+                    lambda device_code: _fetch_deployments(onc, device_code, base_params),
+                    missing_codes)):
+                deployments_by_device[device_code] = deployments
+        
+        # Keep deployments of known hydrophones only, in device order so the
+        # naming below stays deterministic
+        for device_code in device_codes:
+            all_deployments.extend(deployments_by_device[device_code])
         
         print(f"   Found {len(all_deployments)} total deployments")
         
         # Step 4: Group deployments by PARENT location code (like the GitHub repo does)
-        by_parent_loc = defaultdict(list)
+        parent_devices = defaultdict(set)  # parent code -> device codes deployed there
+        parent_citation = {}  # parent code -> citation text of its first deployment
         parent_codes_found = set()
 
         for deployment in all_deployments:
@@ -129,22 +241,29 @@ def list_hydrophone_locations():
             if not loc_code_from_dep:
                 continue
 
-            # Split on '.' to get parent location
-            parent_code = loc_code_from_dep
-            if '.' in loc_code_from_dep:
-                parent_code = loc_code_from_dep.split('.')[0]
+            # Part before the first '.' is the parent location (whole code if none)
+            parent_code = loc_code_from_dep.partition('.')[0]
 
-            by_parent_loc[parent_code].append(deployment)
             parent_codes_found.add(parent_code)
+            
+            if parent_code not in parent_citation:
+                citation = deployment.get('citation')
+                parent_citation[parent_code] = citation.get('citation') if isinstance(citation, dict) else None
+            
+            device_code = deployment.get('deviceCode')
+            if device_code:
+                parent_devices[parent_code].add(device_code)
         
-        if not by_parent_loc:
+        if not parent_codes_found:
             print("❌ No deployments found with processable location codes")
             return
 
-        sorted_parent_codes = sorted(list(parent_codes_found))
+        sorted_parent_codes = sorted(parent_codes_found)
         
-        # Step 5: Build parent location choices with device codes (like the GitHub repo)
-        parent_loc_choices = []
+        # Step 5: Build parent location choices with device codes (like the GitHub repo);
+        # built in parent code order, so already sorted by locationCode
+        sorted_locations = []
+        odp_sites = []
         
         # Define known generic/undesirable names from loc_map (from the GitHub repo)
         GENERIC_LOC_MAP_NAMES = {"Hydrophone Array - Box Type", "Underwater Network"}
@@ -152,8 +271,6 @@ def list_hydrophone_locations():
         print("   Processing parent locations and hydrophones...")
         for parent_code in sorted_parent_codes:
             display_name = None
-            deployments_at_parent = by_parent_loc[parent_code]
-            first_deployment = deployments_at_parent[0] if deployments_at_parent else None
 
             # Naming logic (matching the GitHub repo approach)
             # 1. Try to get name from loc_map, but check if it's generic
@@ -168,11 +285,9 @@ def list_hydrophone_locations():
 
             # 2. Try citation parsing if map lookup failed or gave a generic name
             if display_name is None:
-                if first_deployment:
-                    citation_text = first_deployment.get('citation', {}).get('citation') if isinstance(first_deployment.get('citation'), dict) else None
-                    citation_name = extract_name_from_citation(citation_text)
-                    if citation_name:
-                        display_name = citation_name
+                citation_name = extract_name_from_citation(parent_citation.get(parent_code))
+                if citation_name:
+                    display_name = citation_name
 
             # 3. Fallback: Use generic map name or code itself
             if display_name is None:
@@ -181,39 +296,21 @@ def list_hydrophone_locations():
                 else:
                     display_name = parent_code
 
-            # Get device list (codes only)
-            device_codes_only = set()
-            for dep in deployments_at_parent:
-                device_code = dep.get('deviceCode')
-                if device_code:
-                    device_codes_only.add(device_code)
-
-            device_count = len(device_codes_only)
+            device_count = len(parent_devices[parent_code])
             
             # Store for final display
-            parent_loc_choices.append({
+            location = {
                 'locationCode': parent_code,
                 'locationName': display_name,
                 'deviceCount': device_count
-            })
-        
-        # Step 6: Sort and display results in GitHub repo format
-        sorted_locations = sorted(parent_loc_choices, key=lambda x: x['locationCode'])
-        
-        print(f"\n2a. Select Location:")
-        print("=" * 80)
-        
-        for loc in sorted_locations:
-            print(f"{loc['locationName']} [{loc['locationCode']}] (Devs: {loc['deviceCount']})")
-                
-        print(f"\n✅ Discovery complete! Found {len(sorted_locations)} locations with hydrophone data")
+            }
+            sorted_locations.append(location)
+            if _ODP_RE.search(display_name):
+                odp_sites.append(location)
         
-        # Also show any ODP sites found
-        odp_sites = [loc for loc in sorted_locations if 'ODP' in loc['locationName'].upper()]
-        if odp_sites:
-            print(f"\n🎯 ODP Sites found:")
-            for odp in odp_sites:
-                print(f"   {odp['locationName']} [{odp['locationCode']}]")
+        # Step 6: Display results in GitHub repo format
+        _print_locations(sorted_locations, odp_sites)
+        _save_cached_locations(cache_path, sorted_locations)
         
         return sorted_locations
         
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for the divert state file kept by GmailDivertParser between updates.
+
+Uses a fake Gmail service, so no credentials or network access are needed.
+"""
+
+import base64
+import json
+import os
+import sys
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from hydrophonedashboard.divert.gmail_parser import GmailDivertParser, STATE_VERSION
+
+SOG_BODY = "Hello\nNew Switch Line-Up:\nSoG_East: Bypass\nSoG_Delta: Divert\n"
+NC_BODY = "New Switch Line-Up:\n[1] Barkley Cnyn: Divert\nLocation status\n[5] Folger Pass: Bypass\n"
+
+
+def make_message(message_id, subject, body):
+    """Gmail API message resource with a single text/plain part."""
+    return {
+        'id': message_id,
+        'payload': {
+            'mimeType': 'text/plain',
+            'headers': [
+                {'name': 'Subject', 'value': subject},
+                {'name': 'Date', 'value': 'Tue, 1 Jul 2025 14:44:00 -0700'},
+            ],
+            'body': {'data': base64.urlsafe_b64encode(body.encode()).decode(), 'size': len(body)},
+        },
+    }
+
+
+MESSAGES = [
+    make_message('m2', '[Divert] NC-DDS 2025_07_02 10:00', NC_BODY),
+    make_message('m1', '[Divert] SoG DDS 2025_07_01 14:44', SOG_BODY),
+    make_message('m0', 'Lunch?', 'Not a divert email'),
+]
+
+
+class FakeRequest:
+    def __init__(self, service, params):
+        self.service = service
+        self.params = params
+
+    def execute(self):
+        return self.service.resolve(self.params)
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request, request_id))
+
+    def execute(self):
+        for request, request_id in self.requests:
+            self.callback(request_id, request.execute(), None)
+
+
+class FakeGmailService:
+    """Just enough of the Gmail API for update_divert_status."""
+
+    def __init__(self, messages):
+        self.messages_by_id = {message['id']: message for message in messages}
+        self.fetched = []  # IDs of every messages.get request, in order
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, **params):
+        return FakeRequest(self, {'list': True})
+
+    def get(self, **params):
+        return FakeRequest(self, params)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def resolve(self, params):
+        if params.get('list'):
+            return {'messages': [{'id': message_id} for message_id in self.messages_by_id]}
+
+        self.fetched.append(params['id'])
+        message = self.messages_by_id[params['id']]
+        if params.get('format') == 'metadata':
+            headers = [header for header in message['payload']['headers']
+                       if header['name'] in params.get('metadataHeaders', [])]
+            return {'id': message['id'], 'payload': {'headers': headers}}
+        return message
+
+
+def run_update(state_path, messages=MESSAGES):
+    """Run update_divert_status against a fresh parser and fake service."""
+    parser = GmailDivertParser(state_path=state_path)
+    parser.service = FakeGmailService(messages)
+    parser.update_divert_status(days_back=7)
+    return parser
+
+
+def test_state_round_trip(tmp_path):
+    """A second update reuses the saved emails and fetches nothing."""
+    state_path = str(tmp_path / 'divert_state.json')
+
+    first = run_update(state_path)
+    assert first.service.fetched
+    with open(state_path) as f:
+        state = json.load(f)
+    assert state['version'] == STATE_VERSION
+    assert set(state['emails']) == {'m0', 'm1', 'm2'}
+    assert state['emails']['m0'] is None
+
+    second = run_update(state_path)
+    assert second.service.fetched == []
+    assert second.current_divert_status == first.current_divert_status
+    assert second.divert_periods == first.divert_periods
+    assert [e['locations'] for e in second.divert_history] == [e['locations'] for e in first.divert_history]
+    assert second.current_divert_status['BACNH.H1']['status'] == 'Divert'
+
+
+def test_only_new_emails_are_fetched(tmp_path):
+    """Emails missing from the state are fetched; saved ones are not."""
+    state_path = str(tmp_path / 'divert_state.json')
+    run_update(state_path)
+
+    new_message = make_message('m3', '[Divert] SoG DDS 2025_07_03 09:00', "New Switch Line-Up:\nSoG_East: Divert\n")
+    parser = run_update(state_path, [new_message] + MESSAGES)
+
+    assert set(parser.service.fetched) == {'m3'}
+    assert parser.current_divert_status['ECHO3.H1']['status'] == 'Divert'
+
+
+def test_version_mismatch_discards_state(tmp_path):
+    """A state file from another STATE_VERSION is ignored and rewritten."""
+    state_path = str(tmp_path / 'divert_state.json')
+    run_update(state_path)
+
+    with open(state_path) as f:
+        state = json.load(f)
+    state['version'] = STATE_VERSION - 1
+    # Stale parse results that must not be served
+    state['emails']['m2']['locations'] = {'Location status\n[1] Barkley Cnyn': 'Divert'}
+    with open(state_path, 'w') as f:
+        json.dump(state, f)
+
+    parser = run_update(state_path)
+
+    assert {'m1', 'm2'} <= set(parser.service.fetched)
+    assert parser.current_divert_status['BACNH.H1']['status'] == 'Divert'
+    with open(state_path) as f:
+        assert json.load(f)['version'] == STATE_VERSION
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for GmailDivertParser.get_divert_statistics.
+
+The prefix-sum/bisect implementation is checked against a plain walk over
+the periods that clips each one to the analysis window.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from itertools import product
+
+import pytest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from hydrophonedashboard.divert import DivertPeriod, gmail_parser
+from hydrophonedashboard.divert.gmail_parser import GmailDivertParser
+
+NOW = datetime(2025, 7, 10, 12, 0)
+
+
+class FrozenDatetime(datetime):
+    """datetime whose now() is fixed, so both implementations see the same time."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+def make_periods(offsets, statuses):
+    """Chain periods starting at NOW + offsets (hours); only the last is open."""
+    starts = [NOW + timedelta(hours=offset) for offset in offsets]
+    ends = starts[1:] + [None]
+    return [
+        DivertPeriod(start=start, end=end, status=status, system='SoG DDS')
+        for start, end, status in zip(starts, ends, statuses)
+    ]
+
+
+PERIOD_SETS = {
+    'empty': [],
+    'single_open': make_periods([-30], ['Divert']),
+    'open_last': make_periods([-100, -72, -48, -24, -6], ['Divert', 'Bypass', 'Divert', 'Bypass', 'Divert']),
+    'zero_length_ties': make_periods([-50, -40, -40, -40, -20, -20, -5], ['Divert', 'Bypass', 'Divert', 'Bypass', 'Divert', 'Bypass', 'Divert']),
+    'starts_after_now': make_periods([-30, -10, 5], ['Bypass', 'Divert', 'Bypass']),
+    'closed_after_now': make_periods([-30, 2, 8, 20], ['Divert', 'Bypass', 'Divert', 'Bypass']),
+}
+
+# Query bounds in hours relative to NOW; None leaves the bound off
+START_OFFSETS = [None, -200, -100, -60, -40, -20, -6, 0, 3, 10, 50]
+END_OFFSETS = [None, -120, -100, -45, -40, -20, -1, 0, 4, 8, 30]
+
+
+def clipped_statistics(periods, start_date, end_date):
+    """Reference statistics: clip every overlapping period to the window and sum."""
+    now = datetime.now()
+    overlapping = [
+        period for period in periods
+        if not (start_date and (period.end or now) < start_date)
+        and not (end_date and period.start > end_date)
+    ]
+
+    analysis_start = start_date or (min(p.start for p in overlapping) if overlapping else now)
+    analysis_end = end_date or now
+
+    totals = {'Divert': timedelta(), 'Bypass': timedelta()}
+    counts = {'Divert': 0, 'Bypass': 0}
+    for period in overlapping:
+        period_start = max(period.start, analysis_start)
+        period_end = min(period.end or now, analysis_end)
+        if period_end > period_start:
+            totals[period.status] += period_end - period_start
+            counts[period.status] += 1
+
+    analysis_seconds = (analysis_end - analysis_start).total_seconds()
+    return {
+        'analysis_start': analysis_start,
+        'analysis_end': analysis_end,
+        'total_analysis_time': analysis_end - analysis_start,
+        'total_divert_time': totals['Divert'],
+        'total_bypass_time': totals['Bypass'],
+        'divert_percentage': totals['Divert'].total_seconds() / analysis_seconds * 100 if analysis_seconds > 0 else 0,
+        'bypass_percentage': totals['Bypass'].total_seconds() / analysis_seconds * 100 if analysis_seconds > 0 else 0,
+        'divert_periods_count': counts['Divert'],
+        'bypass_periods_count': counts['Bypass'],
+        'total_periods': len(overlapping),
+    }
+
+
+@pytest.mark.parametrize('name', sorted(PERIOD_SETS))
+def test_statistics_match_clipped_sum(name, monkeypatch):
+    """Every window (bounded or not) gives the same totals as the plain walk."""
+    monkeypatch.setattr(gmail_parser, 'datetime', FrozenDatetime)
+    monkeypatch.setattr(sys.modules[__name__], 'datetime', FrozenDatetime)
+
+    parser = GmailDivertParser()
+    parser.divert_periods = {'CBCH.H1': PERIOD_SETS[name]}
+
+    for start_offset, end_offset in product(START_OFFSETS, END_OFFSETS):
+        start_date = NOW + timedelta(hours=start_offset) if start_offset is not None else None
+        end_date = NOW + timedelta(hours=end_offset) if end_offset is not None else None
+
+        stats = parser.get_divert_statistics('CBCH.H1', start_date=start_date, end_date=end_date)
+        expected = clipped_statistics(PERIOD_SETS[name], start_date, end_date)
+
+        window = (start_offset, end_offset)
+        assert stats['location_code'] == 'CBCH.H1'
+        for key in ('analysis_start', 'analysis_end', 'total_analysis_time', 'total_divert_time',
+                    'total_bypass_time', 'divert_periods_count', 'bypass_periods_count', 'total_periods'):
+            assert stats[key] == expected[key], (window, key)
+        for key in ('divert_percentage', 'bypass_percentage'):
+            assert stats[key] == pytest.approx(expected[key]), (window, key)
+
+
+def test_statistics_for_unknown_location():
+    """A location without periods reports zero time over an empty window."""
+    parser = GmailDivertParser()
+    stats = parser.get_divert_statistics('NOPE.H1')
+
+    assert stats['total_divert_time'] == timedelta()
+    assert stats['total_bypass_time'] == timedelta()
+    assert stats['total_periods'] == 0
+    assert stats['divert_percentage'] == 0
@@ -6,7 +6,7 @@ Use this to test Gmail integration independently of the main hydrophone monitori
 
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -132,11 +132,11 @@ def main():
         print(f"\n📊 Divert periods for {test_location}:")
         if periods:
             for i, period in enumerate(periods):
-                status = period['status']
-                start = period['start'].strftime('%Y-%m-%d %H:%M')
-                end = period['end'].strftime('%Y-%m-%d %H:%M') if period['end'] else 'Ongoing'
-                duration = period['duration']
-                system = period['system']
+                status = period.status
+                start = period.start.strftime('%Y-%m-%d %H:%M')
+                end = period.end.strftime('%Y-%m-%d %H:%M') if period.end else 'Ongoing'
+                duration = (period.end or datetime.now()) - period.start
+                system = period.system
                 print(f"   Period {i+1}: {status} | {start} → {end} | Duration: {duration} | System: {system}")
         else:
             print(f"   No periods found for {test_location}")
@@ -156,10 +156,11 @@ def main():
         # Show all locations with recent divert activity
         all_periods = parser.get_all_divert_periods(start_date=start_date)
         print(f"\n🌐 Locations with divert activity (last 7 days): {len(all_periods)}")
+        now = datetime.now()
         for location, location_periods in all_periods.items():
-            recent_divert_periods = [p for p in location_periods if p['status'] == 'Divert']
+            recent_divert_periods = [p for p in location_periods if p.status == 'Divert']
             if recent_divert_periods:
-                total_divert_time = sum((p['duration'] for p in recent_divert_periods), timedelta())
+                total_divert_time = sum(((p.end or now) - p.start for p in recent_divert_periods), timedelta())
                 print(f"   {location}: {len(recent_divert_periods)} divert periods, {total_divert_time} total diverted time")
                 
         print(f"\n✅ Gmail divert parser test completed successfully!")